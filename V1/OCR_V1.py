@@ -16,7 +16,19 @@
 
 import sys
 import os
-from dotenv import load_dotenv
+import json
+import time
+import logging
+import hashlib
+import mmap
+import importlib.util
+import shelve
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import partial
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dotenv import dotenv_values, load_dotenv
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
@@ -24,33 +36,576 @@ from PySide6.QtWidgets import (
     QGroupBox, QCheckBox, QMessageBox, QStatusBar, QComboBox,
     QProgressBar, QDialog, QDialogButtonBox, QRadioButton, QButtonGroup
 )
-from PySide6.QtCore import Qt, QThread, Signal
-from PySide6.QtGui import QFont
+from PySide6.QtCore import Qt, QObject, QRunnable, QThread, QThreadPool, Signal
+from PySide6.QtGui import QAction, QFont, QImage, QTextCursor
+
+# Tesseract mono-thread : plus rapide sur la majorité des machines.
+# Doit être défini avant le chargement de libtesseract (import de tesserocr).
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
 
 import cv2
-import pytesseract
 import numpy as np
+from tesserocr import PyTessBaseAPI, PSM, OEM, get_languages, tesseract_version
+
+# Noyaux Numba du seuillage Otsu (optionnels, repli sur OpenCV sinon) :
+# version précompilée par build_kernels.py en priorité, sinon JIT. Seule leur
+# présence est vérifiée ici, l'import (Numba : ~200 ms) est différé au premier
+# seuillage Otsu, une option désactivée par défaut
+if importlib.util.find_spec("image_kernels_aot") is not None:
+    KERNELS_MODULE = "image_kernels_aot"
+elif importlib.util.find_spec("numba") is not None:
+    KERNELS_MODULE = "image_kernels"
+else:
+    KERNELS_MODULE = None
+NUMBA_AVAILABLE = KERNELS_MODULE is not None
 
-# Import Google Generative AI
+# Journal de l'application (silencieux sous WARNING, configurable par l'appelant)
+log = logging.getLogger("ocr_gemini")
+
+# Google Generative AI : seule la présence du paquet est vérifiée ici, l'import
+# (lourd : grpc, protobuf, google-auth) est différé au premier appel à l'API
 try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
+    GEMINI_AVAILABLE = importlib.util.find_spec("google.generativeai") is not None
+except ModuleNotFoundError:
     GEMINI_AVAILABLE = False
-    print("⚠️ google-generativeai non installé. Installez avec: pip install google-generativeai")
+if not GEMINI_AVAILABLE:
+    log.warning("google-generativeai non installé. Installez avec: pip install google-generativeai")
 
 # --- CONFIGURATION ---
-# Charger les variables d'environnement depuis .env
+# Charger les variables d'environnement depuis .env (sans écraser celles du
+# shell). On retient si la clé API venait du shell : elle prime alors sur .env
+API_KEY_FROM_SHELL = "GOOGLE_API_KEY" in os.environ
 load_dotenv()
 
-# Configuration Tesseract (Windows)
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+# Prompt envoyé à Gemini (seul le texte OCR varie d'un appel à l'autre).
+# PROMPT_VERSION est à incrémenter à chaque modification : il invalide le cache IA.
+PROMPT_VERSION = 1
+_PROMPT_HEADER = """Tu es un assistant expert en traitement de texte OCR. Analyse le texte suivant qui a été extrait par OCR et peut contenir des erreurs.
+
+TEXTE BRUT EXTRAIT PAR OCR:
+\"\"\"
+{raw_text}
+\"\"\"
+"""
+_PROMPT_INSTRUCTIONS = """
+INSTRUCTIONS:
+1. **CORRECTION**: Corrige toutes les erreurs de lecture OCR (caractères mal reconnus, espaces incorrects), l'orthographe, la grammaire et la ponctuation. Reconstitue les mots coupés ou mal formés.
+
+2. **DÉTECTION DE TYPE**: Identifie le type de document parmi les catégories suivantes:
+   - Lettre formelle / Courrier officiel
+   - Facture / Devis
+   - Contrat / Document juridique
+   - CV / Curriculum Vitae
+   - Article / Publication
+   - Rapport / Compte-rendu
+   - Formulaire administratif
+   - Document médical
+   - Document académique / Diplôme
+   - Correspondance personnelle
+   - Document commercial
+   - Autre (préciser)
+
+RÉPONDS EXACTEMENT AU FORMAT SUIVANT (respecte les balises):
+
+<TYPE_DOCUMENT>
+[Indique ici le type de document détecté]
+</TYPE_DOCUMENT>
+
+<TEXTE_CORRIGE>
+[Insère ici le texte entièrement corrigé et reformaté proprement]
+</TEXTE_CORRIGE>
+
+<CONFIANCE>
+[Indique ton niveau de confiance pour la détection: Élevé/Moyen/Faible]
+</CONFIANCE>
+"""
+_PROMPT_TMPL = _PROMPT_HEADER + _PROMPT_INSTRUCTIONS
+
+# Variante "vision" : le texte est lu par Gemini directement dans l'image jointe
+_VISION_PROMPT = """Tu es un assistant expert en traitement de texte OCR. Le texte à analyser figure dans l'image jointe à ce message. Transcris-le d'abord fidèlement (français, arabe ou anglais), puis applique les instructions suivantes au texte transcrit.
+""" + _PROMPT_INSTRUCTIONS
+
+# Balises de la réponse structurée de Gemini : (ouvrante, fermante, champ)
+_TAG_FIELDS = tuple(
+    (f"<{tag}>", f"</{tag}>", field)
+    for tag, field in (
+        ("TYPE_DOCUMENT", "type_document"),
+        ("TEXTE_CORRIGE", "texte_corrige"),
+        ("CONFIANCE", "confiance"),
+    )
+)
+
+# Modèles Tesseract "fast" (entiers, plusieurs fois plus rapides que "best")
+# À placer dans V1/tessdata_fast/ : fra, ara et eng.traineddata
+TESSDATA_FAST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tessdata_fast")
+
+# Dossier du cache persistant des résultats OCR / IA
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ocr_gemini")
+
+# Liste des modèles Gemini mise en cache sur disque (durée de validité: 24h)
+MODELS_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".config", "ocr_gemini", "models.json")
+MODELS_CACHE_TTL = 24 * 3600
 
 
 # =============================================================================
 #                           CLASSES UTILITAIRES
 # =============================================================================
 
+class OCREngine:
+    """
+    Moteur OCR Tesseract en mémoire (via tesserocr).
+    Les modèles de langue sont chargés une seule fois par instance puis
+    réutilisés pour chaque image : ni processus externe, ni fichier PNG
+    temporaire. Un jeu borné d'instances (une par cœur) est partagé entre
+    les pages du pool `executor` et les bandes de `stripe_executor` (une
+    grande page binarisée est découpée en bandes OCRisées en parallèle).
+    """
+    
+    LANGUAGES = "fra+ara+eng"
+    
+    # Petit côté (px) visé avant l'OCR (~A4 à 200-300 DPI) : au-delà, le temps
+    # d'OCR croît avec la surface sans gain de précision
+    TARGET_SHORT_EDGE = 1800
+    
+    # Marqueurs JPEG "Start Of Frame" (portent les dimensions de l'image) ;
+    # 0xC4 (DHT), 0xC8 (JPG) et 0xCC (DAC) n'en sont pas
+    _JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+    
+    # Hauteur minimale (px) d'une bande OCRisée séparément : en dessous, le
+    # coût d'une reconnaissance supplémentaire dépasse le gain du parallélisme
+    MIN_STRIPE_HEIGHT = 300
+    
+    def __init__(self, lang: str = LANGUAGES, psm: int = PSM.SINGLE_BLOCK,
+                 tessdata_dir: str = TESSDATA_FAST_DIR):
+        self.lang = lang
+        self.psm = psm
+        # Modèles "fast" s'ils sont présents, sinon tessdata par défaut
+        self.tessdata_path = tessdata_dir if self._has_models(tessdata_dir, lang) else None
+        self.max_apis = os.cpu_count() or 1
+        self._apis = []                      # Toutes les instances créées
+        self._api_slots = 0                  # Instances créées ou en cours de création
+        self._idle_apis = []                 # Instances libres (la plus récente en fin de liste)
+        self._executor = None
+        self._stripe_executor = None
+        self._lock = threading.Lock()
+        self._api_available = threading.Condition(self._lock)  # Instance rendue ou créneau libéré
+    
+    def __enter__(self):
+        self._release_api(self._acquire_api())  # Charge les modèles dès l'entrée
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    @staticmethod
+    def _has_models(directory: str, lang: str) -> bool:
+        """Vérifie que le dossier contient un .traineddata pour chaque langue."""
+        return all(
+            os.path.isfile(os.path.join(directory, f"{code}.traineddata"))
+            for code in lang.split("+")
+        )
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Pool persistant de workers OCR (un Tesseract mono-thread par cœur)."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=os.cpu_count(), thread_name_prefix="ocr"
+                )
+            return self._executor
+    
+    @property
+    def stripe_executor(self) -> ThreadPoolExecutor:
+        """
+        Pool dédié aux bandes d'une même page. Distinct de `executor` : une
+        page qui attend ses bandes ne bloque pas les workers qui les traitent.
+        """
+        with self._lock:
+            if self._stripe_executor is None:
+                self._stripe_executor = ThreadPoolExecutor(
+                    max_workers=os.cpu_count(), thread_name_prefix="ocr-stripe"
+                )
+            return self._stripe_executor
+    
+    def _create_api(self) -> PyTessBaseAPI:
+        """Initialise une nouvelle instance Tesseract (créneau déjà réservé)."""
+        kwargs = {"path": self.tessdata_path} if self.tessdata_path else {}
+        try:
+            api = PyTessBaseAPI(lang=self.lang, psm=self.psm, oem=OEM.LSTM_ONLY, **kwargs)
+        except Exception:
+            # Créneau rendu et threads en attente réveillés : chacun retente
+            # la création et reçoit l'erreur, au lieu d'attendre une instance
+            # qui ne viendra pas
+            with self._api_available:
+                self._api_slots -= 1
+                self._api_available.notify_all()
+            raise
+        with self._lock:
+            self._apis.append(api)
+        return api
+    
+    def _acquire_api(self) -> PyTessBaseAPI:
+        """
+        Réserve une instance libre, en crée une tant que `max_apis` n'est pas
+        atteint, sinon attend qu'une instance soit rendue ou qu'un créneau se
+        libère (échec d'initialisation d'un autre thread).
+        """
+        with self._api_available:
+            while not self._idle_apis and self._api_slots >= self.max_apis:
+                self._api_available.wait()
+            if self._idle_apis:
+                return self._idle_apis.pop()
+            self._api_slots += 1
+        return self._create_api()
+    
+    def _release_api(self, api: PyTessBaseAPI):
+        """Rend une instance au jeu partagé et réveille un thread en attente."""
+        with self._api_available:
+            self._idle_apis.append(api)
+            self._api_available.notify()
+    
+    @contextmanager
+    def _api(self):
+        """Instance Tesseract réservée le temps d'une reconnaissance."""
+        api = self._acquire_api()
+        try:
+            yield api
+        finally:
+            self._release_api(api)
+    
+    def warmup(self):
+        """
+        Précharge les modèles de langue dans une première instance, qui sert
+        la première page. Bloquant : à appeler hors du thread de l'interface.
+        Les instances suivantes ne sont créées qu'à la demande (plusieurs
+        pages ou bandes en parallèle).
+        """
+        with self._lock:
+            if self._api_slots:
+                return  # Une instance existe (ou est en cours de création)
+            self._api_slots += 1
+        self._release_api(self._create_api())
+    
+    def extract_with_confidence(self, image) -> tuple:
+        """
+        Extrait le texte et la confiance moyenne de Tesseract (0-100).
+        Une image binarisée assez haute est découpée entre deux lignes de texte
+        et ses bandes sont reconnues en parallèle (tesserocr libère le GIL).
+        """
+        bounds = self._stripe_bounds(image, os.cpu_count() or 1)
+        if len(bounds) < 2:
+            return self._recognize(image)
+        
+        futures = [
+            self.stripe_executor.submit(self._recognize, image[top:bottom])
+            for top, bottom in bounds
+        ]
+        results = [future.result() for future in futures]  # Ordre des lignes conservé
+        text = "\n".join(text for text, _ in results if text)
+        # Confiance pondérée par la quantité de texte de chaque bande
+        total = sum(len(text) for text, _ in results)
+        confidence = sum(len(text) * conf for text, conf in results) // total if total else 0
+        return text, confidence
+    
+    def _recognize(self, image) -> tuple:
+        """Reconnaissance d'une image entière avec une instance du jeu partagé."""
+        with self._api() as api:
+            self._set_image(api, image)
+            text = api.GetUTF8Text().strip()
+            return text, api.MeanTextConf()  # Réutilise le résultat de la reconnaissance
+    
+    @classmethod
+    def _stripe_bounds(cls, image, max_stripes: int) -> list:
+        """
+        Lignes de découpe (haut, bas) d'une image binarisée, choisies par
+        projection horizontale dans les interlignes blancs (au moins 3 lignes
+        de pixels sans encre). Renvoie une liste vide si l'image ne s'y prête pas.
+        """
+        h = image.shape[0]
+        if image.ndim != 2 or max_stripes < 2 or h < 2 * cls.MIN_STRIPE_HEIGHT:
+            return []
+        
+        # Tolérance de quelques pixels isolés (bruit) par ligne
+        ink = np.count_nonzero(image < 128, axis=1)
+        blank = ink <= image.shape[1] // 500
+        safe = np.zeros(h, dtype=bool)
+        safe[1:-1] = blank[:-2] & blank[1:-1] & blank[2:]
+        
+        step = max(cls.MIN_STRIPE_HEIGHT, h // max_stripes)
+        bounds, top = [], 0
+        while h - top >= 2 * step:
+            candidates = np.flatnonzero(safe[top + step:h - step])
+            if candidates.size == 0:
+                break
+            cut = top + step + int(candidates[0])
+            bounds.append((top, cut))
+            top = cut
+        bounds.append((top, h))
+        return bounds
+    
+    @staticmethod
+    def _set_image(api: PyTessBaseAPI, image):
+        """
+        Transmet les pixels bruts à Tesseract (SetImageBytes), sans passer par
+        une image PIL ré-encodée en mémoire comme le fait SetImage.
+        """
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)  # Tesseract attend du RVB
+        h, w = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        api.SetImageBytes(image.tobytes(), w, h, channels, w * channels)
+    
+    def process_data(self, file_data, path: str, preprocess=None) -> tuple:
+        """Décode le contenu d'un fichier image déjà lu puis l'OCRise (texte, confiance)."""
+        image = self.downscale(self.decode_image(file_data, path))
+        if preprocess is not None:
+            image = preprocess(image)
+        return self.extract_with_confidence(image)
+    
+    @classmethod
+    def downscale(cls, image):
+        """Réduit les images surdimensionnées (photos, scans haute résolution)."""
+        h, w = image.shape[:2]
+        scale = cls.TARGET_SHORT_EDGE / min(h, w)
+        if scale >= 1.0:
+            return image
+        return cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    
+    @staticmethod
+    def read_file(path: str):
+        """
+        Projette le fichier image en mémoire (mmap, lecture seule) : le buffer
+        renvoyé est une vue sur le cache de pages du système, sans copie dans
+        le tas Python avant le décodage. Le mapping est libéré avec la vue.
+        """
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return np.empty(0, dtype=np.uint8)  # mmap refuse les fichiers vides
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return np.frombuffer(mapped, dtype=np.uint8)
+        except Exception as e:
+            raise ValueError(f"Impossible de lire le fichier {os.path.basename(path)}: {str(e)}") from e
+    
+    @classmethod
+    def decode_image(cls, file_data, path: str):
+        """Décode le contenu d'un fichier image en ndarray BGR."""
+        name = os.path.basename(path)
+        try:
+            image = cls._decode_reduced(file_data)
+            if image is None:
+                image = cv2.imdecode(file_data, cv2.IMREAD_COLOR)
+        except Exception as e:
+            raise ValueError(f"Impossible de lire le fichier {name}: {str(e)}") from e
+        
+        if image is None:
+            raise ValueError(f"{name} : format d'image non reconnu ou fichier corrompu.")
+        return image
+    
+    @classmethod
+    def _decode_reduced(cls, file_data):
+        """
+        Décode un grand JPEG directement à demi-résolution (mise à l'échelle
+        gratuite pendant l'IDCT), si le résultat reste au-dessus de la taille
+        visée pour l'OCR. La décision repose sur les dimensions lues dans
+        l'en-tête : aucun décodage n'est fait pour rien. Renvoie None sinon.
+        """
+        size = cls._jpeg_size(file_data)
+        if size is None or min(size) < 2 * cls.TARGET_SHORT_EDGE:
+            return None
+        return cv2.imdecode(file_data, cv2.IMREAD_REDUCED_COLOR_2)
+
+    @classmethod
+    def _jpeg_size(cls, file_data):
+        """
+        Dimensions (hauteur, largeur) d'un JPEG lues dans son segment SOF, sans
+        décodage. Renvoie None si le contenu n'est pas un JPEG lisible.
+        """
+        n = file_data.size
+        if n < 4 or file_data[0] != 0xFF or file_data[1] != 0xD8:
+            return None
+        pos = 2
+        while pos + 4 <= n:
+            if file_data[pos] != 0xFF:
+                return None  # Flux corrompu
+            marker = int(file_data[pos + 1])
+            if marker == 0xFF:  # Octet de remplissage
+                pos += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # Marqueurs sans longueur
+                pos += 2
+                continue
+            if marker in (0xD9, 0xDA):  # Fin d'image / début des données : pas de SOF
+                return None
+            length = (int(file_data[pos + 2]) << 8) | int(file_data[pos + 3])
+            if marker in cls._JPEG_SOF_MARKERS:
+                if pos + 9 > n:
+                    return None
+                height = (int(file_data[pos + 5]) << 8) | int(file_data[pos + 6])
+                width = (int(file_data[pos + 7]) << 8) | int(file_data[pos + 8])
+                return height, width
+            pos += 2 + length  # Segment suivant (APPn, EXIF et sa miniature, DQT...)
+        return None
+    
+    def close(self):
+        """Arrête le pool de workers et libère toutes les instances Tesseract."""
+        with self._lock:
+            executors = (self._executor, self._stripe_executor)
+            self._executor = self._stripe_executor = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+        
+        with self._lock:
+            for api in self._apis:
+                api.End()
+            self._apis.clear()
+            self._api_slots = 0
+            self._idle_apis = []
+
+
+class OCRCache:
+    """
+    Cache persistant (shelve) des résultats OCR, indexé par empreinte blake2b.
+    Une image déjà traitée est restituée sans relancer Tesseract.
+    """
+    
+    # À incrémenter quand le prétraitement ou l'OCR changent
+    VERSION = 7
+    
+    def __init__(self, directory: str = CACHE_DIR):
+        self.path = os.path.join(directory, "results")
+        self._db = None
+        self._lock = threading.Lock()  # shelve n'est pas thread-safe
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self._db = shelve.open(self.path)
+        except Exception as e:
+            log.warning("Cache désactivé (%s): %s", self.path, e)
+    
+    @classmethod
+    def _digest(cls, tag: str, data) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"v{cls.VERSION}|{tag}\0".encode("utf-8"))
+        h.update(data)
+        return h.hexdigest()
+    
+    @classmethod
+    def image_key(cls, file_data, options: str) -> str:
+        """Clé d'un résultat OCR : contenu du fichier + options de traitement."""
+        return cls._digest(f"ocr|{options}", file_data)
+    
+    def get(self, key: str):
+        """Renvoie l'entrée associée à la clé, ou None."""
+        if self._db is None:
+            return None
+        with self._lock:
+            try:
+                return self._db.get(key)
+            except Exception:
+                return None
+    
+    def set(self, key: str, value: dict):
+        """Enregistre une entrée et la persiste immédiatement."""
+        if self._db is None:
+            return
+        with self._lock:
+            try:
+                self._db[key] = value
+                self._db.sync()
+            except Exception as e:
+                log.warning("Erreur d'écriture du cache: %s", e)
+    
+    def clear(self):
+        """Supprime toutes les entrées du cache."""
+        if self._db is None:
+            return
+        with self._lock:
+            try:
+                self._db.clear()
+                self._db.sync()
+            except Exception as e:
+                log.warning("Erreur de vidage du cache: %s", e)
+    
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class GeminiResponseCache:
+    """
+    Cache persistant (SQLite, mode WAL) des réponses Gemini, indexé par
+    empreinte du modèle, du texte brut et de la version du prompt.
+    Un texte déjà corrigé est restitué sans appel réseau ni génération.
+    """
+    
+    def __init__(self, directory: str = CACHE_DIR):
+        self.path = os.path.join(directory, "gemini.sqlite3")
+        self._conn = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.commit()
+        except (OSError, sqlite3.Error) as e:
+            log.warning("Cache IA désactivé (%s): %s", self.path, e)
+            self._conn = None
+    
+    @staticmethod
+    def key(model_name: str, raw_text: str) -> str:
+        """Clé d'une réponse : modèle + texte brut + version du prompt."""
+        data = f"{model_name}\0{raw_text}\0{PROMPT_VERSION}".encode("utf-8")
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+    
+    def get(self, key: str):
+        """Renvoie le résultat associé à la clé, ou None."""
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row else None
+    
+    def set(self, key: str, result: dict):
+        """Enregistre un résultat."""
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                (key, json.dumps(result, ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            log.warning("Erreur d'écriture du cache IA: %s", e)
+    
+    def clear(self):
+        """Supprime toutes les réponses enregistrées."""
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            log.warning("Erreur de vidage du cache IA: %s", e)
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
 class GeminiAPIManager:
     """
     Gestionnaire de l'API Google Gemini.
@@ -65,112 +620,215 @@ class GeminiAPIManager:
         "gemini-1.5-pro",
     ]
     
+    # En dessous de ces seuils, l'appel à Gemini est jugé inutile
+    MIN_TEXT_LENGTH = 20      # caractères
+    MIN_OCR_CONFIDENCE = 60   # confiance moyenne Tesseract (0-100)
+    
+    # Encodage des images envoyées en ligne (inline_data) au mode vision :
+    # WebP avec perte pour les photos, PNG à compression rapide pour les
+    # images binarisées (déjà très compressibles, l'encodage prime)
+    WEBP_QUALITY = 80
+    PNG_COMPRESSION = 1
+    
     def __init__(self):
         self.api_key = None
         self.model = None
         self.model_name = None
         self.available_models = []
-        
+        self._genai = None
+        self._configured = False
+        self._models = {}  # Modèles déjà instanciés (leur client gRPC est réutilisé)
+        
+    @property
+    def genai(self):
+        """Module google.generativeai, importé au premier usage."""
+        if self._genai is None:
+            import google.generativeai as genai
+            self._genai = genai
+        return self._genai
+    
     def configure(self, api_key: str) -> bool:
-        """Configure l'API avec la clé fournie."""
+        """
+        Configure l'API avec la clé fournie.
+        Reconfigurer réinitialise les clients (et leurs connexions) de genai :
+        l'appel est donc ignoré si la même clé est déjà configurée.
+        """
+        if self._configured and api_key == self.api_key:
+            return True
         try:
+            self.genai.configure(api_key=api_key, transport="grpc")
             self.api_key = api_key
-            genai.configure(api_key=api_key)
+            self._configured = True
+            self._models.clear()
             return True
         except Exception as e:
-            print(f"Erreur de configuration API: {e}")
+            log.exception("Erreur de configuration API: %s", e)
             return False
     
-    def fetch_available_models(self) -> list:
-        """Récupère la liste des modèles disponibles supportant generateContent."""
+    def fetch_available_models(self, force_refresh: bool = False, raise_errors: bool = False) -> list:
+        """
+        Récupère la liste des modèles disponibles supportant generateContent.
+        La liste est relue depuis le cache disque si elle a moins de 24h,
+        sauf si `force_refresh` est demandé. En cas d'échec, la liste des
+        modèles recommandés est renvoyée, ou l'erreur propagée si `raise_errors`.
+        """
+        if not force_refresh:
+            cached = self._load_cached_models()
+            if cached:
+                self.available_models = cached
+                return cached
+        
         try:
-            models = []
-            for model in genai.list_models():
+            models = [
+                model.name.replace('models/', '')
+                for model in self.genai.list_models()
                 # Filtrer les modèles qui supportent la génération de contenu
-                if 'generateContent' in model.supported_generation_methods:
-                    model_name = model.name.replace('models/', '')
-                    models.append(model_name)
-            
-            # Prioriser les modèles recommandés
-            prioritized = []
-            for rec in self.RECOMMENDED_MODELS:
-                if rec in models:
-                    prioritized.append(rec)
+                if 'generateContent' in model.supported_generation_methods
+            ]
             
-            # Ajouter les autres modèles
-            for m in models:
-                if m not in prioritized and 'gemini' in m.lower():
-                    prioritized.append(m)
+            # Prioriser les modèles recommandés, puis ajouter les autres modèles Gemini
+            models_set = set(models)
+            recommended_set = set(self.RECOMMENDED_MODELS)
+            prioritized = [rec for rec in self.RECOMMENDED_MODELS if rec in models_set]
+            prioritized += [m for m in models if m not in recommended_set and 'gemini' in m.lower()]
                     
             self.available_models = prioritized if prioritized else models
+            self._save_cached_models(self.available_models)
             return self.available_models
             
         except Exception as e:
-            print(f"Erreur lors de la récupération des modèles: {e}")
+            log.exception("Erreur lors de la récupération des modèles: %s", e)
+            if raise_errors:
+                raise
             return self.RECOMMENDED_MODELS  # Fallback
     
+    def _models_cache_owner(self) -> str:
+        """Empreinte de la clé API (la liste des modèles dépend du compte)."""
+        return hashlib.blake2b((self.api_key or "").encode("utf-8"), digest_size=8).hexdigest()
+    
+    def _load_cached_models(self) -> list:
+        """Lit la liste des modèles en cache si elle est encore valide."""
+        try:
+            with open(MODELS_CACHE_FILE, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        
+        if data.get("owner") != self._models_cache_owner():
+            return []
+        if time.time() - data.get("ts", 0) >= MODELS_CACHE_TTL:
+            return []
+        return data.get("models", [])
+    
+    def _save_cached_models(self, models: list):
+        """Enregistre la liste des modèles avec son horodatage."""
+        try:
+            os.makedirs(os.path.dirname(MODELS_CACHE_FILE), exist_ok=True)
+            with open(MODELS_CACHE_FILE, "w", encoding="utf-8") as f:
+                json.dump({"ts": time.time(), "owner": self._models_cache_owner(), "models": models}, f)
+        except OSError as e:
+            log.warning("Impossible d'enregistrer la liste des modèles: %s", e)
+    
     def select_model(self, model_name: str) -> bool:
         """Sélectionne et initialise un modèle."""
         try:
-            self.model = genai.GenerativeModel(model_name)
+            if model_name not in self._models:
+                self._models[model_name] = self.genai.GenerativeModel(model_name)
+            self.model = self._models[model_name]
             self.model_name = model_name
             return True
         except Exception as e:
-            print(f"Erreur de sélection du modèle: {e}")
+            log.exception("Erreur de sélection du modèle: %s", e)
             return False
     
-    def process_text(self, raw_text: str) -> dict:
+    @classmethod
+    def is_worth_processing(cls, page_texts: list, confidence=None) -> bool:
+        """
+        Indique si le texte OCR mérite un appel à Gemini : assez de texte
+        (sommé sur les pages, sans les en-têtes ajoutés) et une confiance
+        OCR suffisante lorsqu'elle est connue.
+        """
+        length = sum(len(text.strip()) for text in page_texts)
+        if length < cls.MIN_TEXT_LENGTH:
+            return False
+        return confidence is None or confidence >= cls.MIN_OCR_CONFIDENCE
+
+    def process_text(self, raw_text: str, on_chunk=None, confidence=None, page_texts=None) -> dict:
         """
         Envoie le texte à Gemini pour correction et détection de type.
         Retourne un dictionnaire avec le texte corrigé et le type de document.
+        Si `on_chunk` est fourni, la réponse est reçue en streaming et chaque
+        fragment lui est transmis dès son arrivée.
+        Un texte trop court ou une confiance OCR trop faible (`confidence`,
+        0-100) n'est pas envoyé : le texte brut est renvoyé tel quel. Si
+        `page_texts` est fourni, la longueur est évaluée sur les pages.
         """
+        if not self.is_worth_processing(page_texts or [raw_text], confidence):
+            return {
+                "type_document": "Non détecté (confiance faible)",
+                "texte_corrige": raw_text,
+                "confiance": "Faible",
+                "skipped": True,
+            }
+        
         if not self.model:
             return {"error": "Aucun modèle sélectionné"}
         
-        prompt = f"""Tu es un assistant expert en traitement de texte OCR. Analyse le texte suivant qui a été extrait par OCR et peut contenir des erreurs.
-
-TEXTE BRUT EXTRAIT PAR OCR:
-\"\"\"
-{raw_text}
-\"\"\"
-
-INSTRUCTIONS:
-1. **CORRECTION**: Corrige toutes les erreurs de lecture OCR (caractères mal reconnus, espaces incorrects), l'orthographe, la grammaire et la ponctuation. Reconstitue les mots coupés ou mal formés.
-
-2. **DÉTECTION DE TYPE**: Identifie le type de document parmi les catégories suivantes:
-   - Lettre formelle / Courrier officiel
-   - Facture / Devis
-   - Contrat / Document juridique
-   - CV / Curriculum Vitae
-   - Article / Publication
-   - Rapport / Compte-rendu
-   - Formulaire administratif
-   - Document médical
-   - Document académique / Diplôme
-   - Correspondance personnelle
-   - Document commercial
-   - Autre (préciser)
-
-RÉPONDS EXACTEMENT AU FORMAT SUIVANT (respecte les balises):
-
-<TYPE_DOCUMENT>
-[Indique ici le type de document détecté]
-</TYPE_DOCUMENT>
-
-<TEXTE_CORRIGE>
-[Insère ici le texte entièrement corrigé et reformaté proprement]
-</TEXTE_CORRIGE>
-
-<CONFIANCE>
-[Indique ton niveau de confiance pour la détection: Élevé/Moyen/Faible]
-</CONFIANCE>
-"""
+        prompt = _PROMPT_TMPL.format_map({"raw_text": raw_text})
+        return self._generate(self.model, prompt, on_chunk)
+    
+    def process_image(self, image, on_chunk=None) -> dict:
+        """
+        Mode vision : envoie l'image (ndarray OpenCV) à Gemini, qui lit le
+        texte lui-même au lieu de corriger une extraction Tesseract.
+        Retourne le même dictionnaire que `process_text`.
+        """
+        if not self.model:
+            return {"error": "Aucun modèle sélectionné"}
         
         try:
-            response = self.model.generate_content(prompt)
-            result_text = response.text
+            mime_type, data = self.encode_image(image)
+        except ValueError as e:
+            return {"error": str(e)}
+        
+        contents = [_VISION_PROMPT, {"inline_data": {"mime_type": mime_type, "data": data}}]
+        return self._generate(self.model, contents, on_chunk)
+    
+    @classmethod
+    def encode_image(cls, image) -> tuple:
+        """
+        Encode une image pour l'envoi en ligne : (type MIME, octets).
+        WebP est plusieurs fois plus compact que PNG sur une photo ; une
+        image binarisée (un seul canal) part en PNG, sans perte.
+        """
+        if image.ndim == 2:
+            mime_type, ext = "image/png", ".png"
+            params = [cv2.IMWRITE_PNG_COMPRESSION, cls.PNG_COMPRESSION]
+        else:
+            mime_type, ext = "image/webp", ".webp"
+            params = [cv2.IMWRITE_WEBP_QUALITY, cls.WEBP_QUALITY]
+        ok, buffer = cv2.imencode(ext, image, params)
+        if not ok:
+            raise ValueError(f"Impossible d'encoder l'image en {ext[1:].upper()}.")
+        return mime_type, buffer.tobytes()
+    
+    def _generate(self, model, contents, on_chunk=None) -> dict:
+        """Appelle generate_content (en streaming si `on_chunk`) puis analyse la réponse."""
+        try:
+            if on_chunk is None:
+                result_text = model.generate_content(contents).text
+            else:
+                parts = []
+                for chunk in model.generate_content(contents, stream=True):
+                    try:
+                        text = chunk.text
+                    except ValueError:  # Fragment sans contenu textuel
+                        continue
+                    parts.append(text)
+                    on_chunk(text)
+                result_text = "".join(parts)
             
-            # Parser la réponse
+            # Parser la réponse complète (balises) en fin de flux
             return self._parse_response(result_text)
             
         except Exception as e:
@@ -182,60 +840,197 @@ RÉPONDS EXACTEMENT AU FORMAT SUIVANT (respecte les balises):
             "type_document": "Non détecté",
             "texte_corrige": "",
             "confiance": "Non spécifié",
-            "raw_response": response_text
         }
         
+        # Recherche bornée : la balise fermante est cherchée après l'ouvrante.
+        # str.find est ici plus rapide qu'une regex ou qu'une recherche en bytes.
+        for open_tag, close_tag, field in _TAG_FIELDS:
+            start = response_text.find(open_tag)
+            if start < 0:
+                continue
+            start += len(open_tag)
+            end = response_text.find(close_tag, start)
+            if end < 0:
+                continue
+            result[field] = response_text[start:end].strip()
+        
+        # Sans texte corrigé extrait (réponse non balisée, ou tronquée dans
+        # <TEXTE_CORRIGE> par la limite de jetons), la réponse brute est conservée
+        if not result["texte_corrige"]:
+            result["raw_response"] = response_text
+        return result
+
+
+class OCRProcessingThread(QThread):
+    """
+    Thread pour l'OCR en arrière-plan : les pages sont traitées en parallèle.
+    Émet la liste des couples (texte, confiance) dans l'ordre des pages.
+    L'extraction peut être interrompue via `requestInterruption()`.
+    """
+    progress = Signal(int, str)
+    finished = Signal(list)
+    error = Signal(str)
+    cancelled = Signal()
+    
+    def __init__(self, ocr_engine, paths, preprocess=None, cache=None, cache_options=""):
+        super().__init__()
+        self.ocr_engine = ocr_engine
+        self.paths = paths
+        self.preprocess = preprocess
+        self.cache = cache
+        self.cache_options = cache_options
+    
+    def _process_page(self, path: str) -> tuple:
+        """OCR d'une page, court-circuité si l'image est déjà en cache."""
+        file_data = self.ocr_engine.read_file(path)
+        if self.cache is None:
+            return self.ocr_engine.process_data(file_data, path, self.preprocess)
+        
+        key = OCRCache.image_key(file_data, self.cache_options)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached["raw_text"], cached.get("confidence")
+        
+        text, confidence = self.ocr_engine.process_data(file_data, path, self.preprocess)
+        self.cache.set(key, {"raw_text": text, "confidence": confidence})
+        return text, confidence
+    
+    def run(self):
+        total = len(self.paths)
+        futures = {
+            self.ocr_engine.executor.submit(self._process_page, path): index
+            for index, path in enumerate(self.paths)
+        }
+        pages = [None] * total
+        pending = set(futures)
+        self.progress.emit(0, f"Extraction du texte (OCR) — {total} page(s)...")
+        
         try:
-            # Extraire le type de document
-            if "<TYPE_DOCUMENT>" in response_text and "</TYPE_DOCUMENT>" in response_text:
-                start = response_text.find("<TYPE_DOCUMENT>") + len("<TYPE_DOCUMENT>")
-                end = response_text.find("</TYPE_DOCUMENT>")
-                result["type_document"] = response_text[start:end].strip()
-            
-            # Extraire le texte corrigé
-            if "<TEXTE_CORRIGE>" in response_text and "</TEXTE_CORRIGE>" in response_text:
-                start = response_text.find("<TEXTE_CORRIGE>") + len("<TEXTE_CORRIGE>")
-                end = response_text.find("</TEXTE_CORRIGE>")
-                result["texte_corrige"] = response_text[start:end].strip()
-            
-            # Extraire le niveau de confiance
-            if "<CONFIANCE>" in response_text and "</CONFIANCE>" in response_text:
-                start = response_text.find("<CONFIANCE>") + len("<CONFIANCE>")
-                end = response_text.find("</CONFIANCE>")
-                result["confiance"] = response_text[start:end].strip()
+            while pending:
+                if self.isInterruptionRequested():
+                    self._cancel(pending)
+                    self.cancelled.emit()
+                    return
                 
+                # Attente courte pour rester réactif à une demande d'annulation
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pages[futures[future]] = future.result()
+                completed = total - len(pending)
+                self.progress.emit(completed * 100 // total, f"Page {completed}/{total} extraite")
+        except ValueError as e:
+            self._cancel(pending)
+            self.error.emit(str(e))
+            return
         except Exception as e:
-            result["error"] = f"Erreur de parsing: {str(e)}"
-            result["texte_corrige"] = response_text  # Fallback
-            
-        return result
+            self._cancel(pending)
+            self.error.emit(f"Erreur Tesseract: {str(e)}")
+            return
+        
+        self.finished.emit(pages)
+    
+    @staticmethod
+    def _cancel(futures):
+        """Annule les pages pas encore démarrées (celles en cours se terminent)."""
+        for future in futures:
+            future.cancel()
+
+
+class TesseractWarmupThread(QThread):
+    """Thread de préchargement des modèles Tesseract au démarrage de l'application."""
+    error = Signal(str)
+    
+    def __init__(self, ocr_engine):
+        super().__init__()
+        self.ocr_engine = ocr_engine
+    
+    def run(self):
+        try:
+            self.ocr_engine.warmup()
+        except Exception as e:
+            self.error.emit(f"Préchargement Tesseract impossible: {str(e)}")
 
 
-class AIProcessingThread(QThread):
-    """Thread pour le traitement IA en arrière-plan (non bloquant)."""
+class ModelFetchThread(QThread):
+    """
+    Thread de récupération des modèles Gemini (import de la bibliothèque,
+    configuration et appel réseau) hors du thread de l'interface.
+    En cas d'échec, `error` est émis puis `finished` avec une liste vide.
+    """
+    finished = Signal(list)
+    error = Signal(str)
+    
+    def __init__(self, gemini_manager, api_key: str, force_refresh: bool = False):
+        super().__init__()
+        self.gemini_manager = gemini_manager
+        self.api_key = api_key
+        self.force_refresh = force_refresh
+    
+    def run(self):
+        if not self.gemini_manager.configure(self.api_key):
+            self.error.emit("Configuration de l'API Gemini impossible (clé invalide ?).")
+            self.finished.emit([])
+            return
+        try:
+            models = self.gemini_manager.fetch_available_models(self.force_refresh, raise_errors=True)
+        except Exception as e:
+            self.error.emit(f"Liste des modèles indisponible: {str(e)}")
+            self.finished.emit([])
+            return
+        self.finished.emit(models)
+
+
+class AIProcessingSignals(QObject):
+    """Signaux du traitement IA (un QRunnable ne peut pas porter de signaux)."""
     finished = Signal(dict)
     error = Signal(str)
+    chunk_received = Signal(str)
+
+
+class AIProcessingRunnable(QRunnable):
+    """Tâche de traitement IA exécutée dans le QThreadPool (non bloquante)."""
     
-    def __init__(self, gemini_manager, text):
+    def __init__(self, gemini_manager, text, confidence=None, page_texts=None):
         super().__init__()
         self.gemini_manager = gemini_manager
         self.text = text
+        self.confidence = confidence
+        self.page_texts = page_texts
+        self.signals = AIProcessingSignals()
     
     def run(self):
         try:
-            result = self.gemini_manager.process_text(self.text)
-            self.finished.emit(result)
+            result = self.gemini_manager.process_text(
+                self.text, self.signals.chunk_received.emit, self.confidence,
+                self.page_texts,
+            )
+            self.signals.finished.emit(result)
         except Exception as e:
-            self.error.emit(str(e))
+            self.signals.error.emit(str(e))
 
 
 class ModelSelectionDialog(QDialog):
     """Dialogue pour sélectionner le modèle Gemini."""
     
+    # Feuille de style définie une seule fois (appliquée au dialogue entier)
+    _STYLESHEET = """
+        QLabel#InfoLabel {
+            color: #2c3e50; padding: 10px;
+            background-color: #ecf0f1; border-radius: 5px;
+        }
+        QComboBox {
+            padding: 8px;
+            font-size: 11pt;
+            border: 1px solid #bdc3c7;
+            border-radius: 4px;
+        }
+    """
+    
     def __init__(self, models: list, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Sélection du Modèle Google Gemini")
         self.setMinimumWidth(450)
+        self.setStyleSheet(self._STYLESHEET)
         self.selected_model = None
         
         layout = QVBoxLayout(self)
@@ -248,20 +1043,12 @@ class ModelSelectionDialog(QDialog):
             "• gemini-1.5-pro : Plus puissant, meilleure qualité"
         )
         info_label.setWordWrap(True)
-        info_label.setStyleSheet("color: #2c3e50; padding: 10px; background-color: #ecf0f1; border-radius: 5px;")
+        info_label.setObjectName("InfoLabel")
         layout.addWidget(info_label)
         
         # ComboBox pour la sélection
         self.model_combo = QComboBox()
         self.model_combo.addItems(models)
-        self.model_combo.setStyleSheet("""
-            QComboBox {
-                padding: 8px;
-                font-size: 11pt;
-                border: 1px solid #bdc3c7;
-                border-radius: 4px;
-            }
-        """)
         layout.addWidget(self.model_combo)
         
         # Boutons
@@ -279,10 +1066,31 @@ class ModelSelectionDialog(QDialog):
 class AIConfirmationDialog(QDialog):
     """Dialogue pour confirmer le lancement du traitement IA."""
     
+    # Feuille de style définie une seule fois (appliquée au dialogue entier)
+    _STYLESHEET = """
+        QLabel#InfoLabel { font-size: 10pt; color: #2c3e50; }
+        QPlainTextEdit { background-color: #f8f9fa; color: #2c3e50; }
+        QPushButton#YesButton {
+            background-color: #27ae60; color: white; 
+            padding: 10px 20px; border-radius: 5px; font-weight: bold;
+        }
+        QPushButton#YesButton:hover { background-color: #219a52; }
+        QPushButton#NoButton {
+            background-color: #95a5a6; color: white;
+            padding: 10px 20px; border-radius: 5px;
+        }
+        QPushButton#NoButton:hover { background-color: #7f8c8d; }
+    """
+    
+    # Nombre de caractères affichés dans l'aperçu
+    PREVIEW_LENGTH = 500
+    
     def __init__(self, text_preview: str, parent=None):
+        """`text_preview` est l'aperçu déjà tronqué par l'appelant (voir `make_preview`)."""
         super().__init__(parent)
         self.setWindowTitle("Traitement par Intelligence Artificielle")
         self.setMinimumSize(500, 350)
+        self.setStyleSheet(self._STYLESHEET)
         
         layout = QVBoxLayout(self)
         
@@ -293,7 +1101,7 @@ class AIConfirmationDialog(QDialog):
             "  • Corriger les erreurs OCR et d'orthographe\n"
             "  • Détecter automatiquement le type de document"
         )
-        info_label.setStyleSheet("font-size: 10pt; color: #2c3e50;")
+        info_label.setObjectName("InfoLabel")
         layout.addWidget(info_label)
         
         # Aperçu du texte
@@ -301,10 +1109,9 @@ class AIConfirmationDialog(QDialog):
         preview_layout = QVBoxLayout(preview_group)
         
         preview_text = QPlainTextEdit()
-        preview_text.setPlainText(text_preview[:500] + ("..." if len(text_preview) > 500 else ""))
+        preview_text.setPlainText(text_preview)
         preview_text.setReadOnly(True)
         preview_text.setMaximumHeight(150)
-        preview_text.setStyleSheet("background-color: #f8f9fa; color: #2c3e50;")
         preview_layout.addWidget(preview_text)
         
         layout.addWidget(preview_group)
@@ -313,28 +1120,22 @@ class AIConfirmationDialog(QDialog):
         button_layout = QHBoxLayout()
         
         self.btn_yes = QPushButton("🚀 Oui, lancer le traitement IA")
-        self.btn_yes.setStyleSheet("""
-            QPushButton {
-                background-color: #27ae60; color: white; 
-                padding: 10px 20px; border-radius: 5px; font-weight: bold;
-            }
-            QPushButton:hover { background-color: #219a52; }
-        """)
+        self.btn_yes.setObjectName("YesButton")
         self.btn_yes.clicked.connect(self.accept)
         
         self.btn_no = QPushButton("Non, garder le texte brut")
-        self.btn_no.setStyleSheet("""
-            QPushButton {
-                background-color: #95a5a6; color: white;
-                padding: 10px 20px; border-radius: 5px;
-            }
-            QPushButton:hover { background-color: #7f8c8d; }
-        """)
+        self.btn_no.setObjectName("NoButton")
         self.btn_no.clicked.connect(self.reject)
         
         button_layout.addWidget(self.btn_no)
         button_layout.addWidget(self.btn_yes)
         layout.addLayout(button_layout)
+    
+    @classmethod
+    def make_preview(cls, text: str) -> str:
+        """Tronque le texte à la longueur d'aperçu (avec '...' si coupé)."""
+        head = text[:cls.PREVIEW_LENGTH]
+        return head + "..." if len(text) > cls.PREVIEW_LENGTH else head
 
 
 # =============================================================================
@@ -344,40 +1145,201 @@ class AIConfirmationDialog(QDialog):
 class ImageProcessorInterface(QMainWindow):
     """Interface principale de l'application OCR + IA."""
     
+    # Part minimale des pixels dans les deux niveaux dominants pour considérer
+    # une image comme déjà binaire (scan noir et blanc) et sauter la binarisation
+    BINARY_MASS_RATIO = 0.95
+    
+    # Feuille de style de l'application, définie une seule fois
+    _STYLESHEET = """
+        QMainWindow { background-color: #ffffff; }
+        
+        QWidget { 
+            background-color: #ffffff;
+            font-family: 'Segoe UI', 'Arial', sans-serif;
+            color: #2c3e50;
+        }
+        
+        QGroupBox {
+            font-weight: bold;
+            color: #2c3e50;
+            border: 1px solid #dcdfe4;
+            border-radius: 8px;
+            margin-top: 12px;
+            padding: 15px;
+        }
+        QGroupBox::title {
+            subcontrol-origin: margin;
+            left: 12px;
+            padding: 0 8px;
+            background-color: #ffffff;
+            color: #2c3e50;
+        }
+        
+        QCheckBox {
+            color: #2c3e50;
+            spacing: 8px;
+            font-size: 10pt;
+        }
+        QCheckBox::indicator {
+            width: 18px;
+            height: 18px;
+        }
+        
+        QComboBox {
+            padding: 6px 10px;
+            border: 1px solid #bdc3c7;
+            border-radius: 4px;
+            background-color: #ffffff;
+            color: #2c3e50;
+        }
+        QComboBox:hover { border-color: #3498db; }
+        QComboBox::drop-down {
+            border: none;
+            width: 25px;
+        }
+        
+        QPlainTextEdit {
+            border: 1px solid #bdc3c7;
+            border-radius: 6px;
+            padding: 10px;
+            background-color: #f8f9fa;
+            color: #2c3e50;
+            font-size: 10pt;
+            font-family: 'Consolas', 'Courier New', monospace;
+        }
+        
+        QProgressBar {
+            border: 1px solid #bdc3c7;
+            border-radius: 4px;
+            text-align: center;
+            background-color: #ecf0f1;
+        }
+        QProgressBar::chunk {
+            background-color: #3498db;
+            border-radius: 3px;
+        }
+        
+        QPushButton#PrimaryButton {
+            background-color: #34495e;
+            color: white;
+            border-radius: 6px;
+            padding: 10px 15px;
+            border: none;
+            font-weight: bold;
+        }
+        QPushButton#PrimaryButton:hover { background-color: #2c3e50; }
+        
+        QPushButton#AccentButton {
+            background-color: #3498db;
+            color: white;
+            border-radius: 8px;
+            font-weight: bold;
+            font-size: 12pt;
+            border: none;
+            padding: 12px 25px;
+        }
+        QPushButton#AccentButton:hover { background-color: #2980b9; }
+        QPushButton#AccentButton:disabled { background-color: #bdc3c7; }
+        
+        QPushButton#SecondaryButton {
+            background-color: #ecf0f1;
+            color: #2c3e50;
+            border: 1px solid #bdc3c7;
+            border-radius: 4px;
+            padding: 6px 15px;
+        }
+        QPushButton#SecondaryButton:hover { background-color: #d5dbdb; }
+        
+        QPushButton#AIButton {
+            background-color: #9b59b6;
+            color: white;
+            border-radius: 6px;
+            padding: 10px 20px;
+            font-weight: bold;
+            border: none;
+        }
+        QPushButton#AIButton:hover { background-color: #8e44ad; }
+        QPushButton#AIButton:disabled { background-color: #bdc3c7; }
+        
+        QStatusBar {
+            background-color: #f0f0f0;
+            color: #2c3e50;
+            border-top: 1px solid #dcdfe4;
+        }
+        
+        QLabel {
+            color: #2c3e50;
+        }
+    """
+    
+    # Style des séparateurs horizontaux
+    _SEP_STYLE = "background-color: #bdc3c7;"
+    
+    # Module des noyaux Numba une fois importé (False si l'import a échoué)
+    _kernels = None
+    
+    # Valeur d'exemple de .env.example (clé non renseignée)
+    API_KEY_PLACEHOLDER = "votre_cle_api_google_ici"
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("🔍 OCR Intelligent + Google Gemini AI")
         self.setGeometry(100, 100, 1000, 800)
         
         # Variables d'état
-        self.current_file_path = None
+        self.current_file_paths = []
         self.raw_extracted_text = ""
+        self.ocr_page_texts = []
+        self.ocr_confidence = None
+        self.ocr_engine = OCREngine()
+        self.cache = OCRCache()
+        self.ai_cache = GeminiResponseCache()
+        self._pending_ai_key = None
         self.gemini_manager = GeminiAPIManager() if GEMINI_AVAILABLE else None
-        self.ai_thread = None
+        self.ocr_thread = None
+        self._pending_ocr_thread = None  # Job OCR en attente de la fin du préchargement
+        self._tess_ready = False
+        self.model_fetch_thread = None
         
-        # Initialiser l'API Gemini
-        self._init_gemini_api()
+        # Clé API lue une seule fois (relue lors d'une actualisation des modèles)
+        self._reload_api_key()
+        
+        # Buffers de travail du prétraitement, réutilisés d'une image à l'autre
+        # (un jeu par worker OCR, les pages étant traitées en parallèle)
+        self._work_buffers = threading.local()
+        
+        # Pool partagé pour les tâches IA (borné pour éviter les rafales d'appels Gemini)
+        self.ai_pool = QThreadPool.globalInstance()
+        self.ai_pool.setMaxThreadCount(min(8, os.cpu_count() or 1))
         
         # Style général
-        self.setStyleSheet(self._get_professional_stylesheet())
+        self.setStyleSheet(self._STYLESHEET)
         
         # Construction de l'interface
         self._build_ui()
         
+        # Initialiser l'API Gemini (liste des modèles récupérée en arrière-plan)
+        self._init_gemini_api()
+        
+        # Chargement des modèles de langue en arrière-plan (évite l'attente au 1er clic)
+        self.warmup_thread = TesseractWarmupThread(self.ocr_engine)
+        self.warmup_thread.error.connect(self.status_bar.showMessage)
+        self.warmup_thread.finished.connect(self._on_warmup_finished)
+        self.warmup_thread.start()
+        
     def _init_gemini_api(self):
-        """Initialise l'API Google Gemini avec la clé d'environnement."""
+        """
+        Initialise l'API Google Gemini avec la clé d'environnement. La liste
+        des modèles est récupérée par un thread : la fenêtre s'affiche avec
+        les modèles recommandés, remplacés à la réception de la liste.
+        """
         if not GEMINI_AVAILABLE:
             return
-            
-        api_key = os.getenv("GOOGLE_API_KEY")
         
-        if api_key and api_key != "votre_cle_api_google_ici":
-            if self.gemini_manager.configure(api_key):
-                models = self.gemini_manager.fetch_available_models()
-                if models:
-                    self.gemini_manager.select_model(models[0])  # Modèle par défaut
+        if self._api_key_valid:
+            self._start_model_fetch(self._api_key)
         else:
-            print("⚠️ Clé API Google non configurée. Créez un fichier .env avec GOOGLE_API_KEY=votre_clé")
+            log.warning("Clé API Google non configurée. Créez un fichier .env avec GOOGLE_API_KEY=votre_clé")
     
     def _build_ui(self):
         """Construit l'interface utilisateur."""
@@ -411,15 +1373,24 @@ class ImageProcessorInterface(QMainWindow):
         options_group = QGroupBox("2. Options OCR")
         options_layout = QVBoxLayout(options_group)
         
-        self.option_enhance = QCheckBox("🖼️ Amélioration d'image (Bruit/Otsu)")
+        self.option_enhance = QCheckBox("🖼️ Amélioration d'image (binarisation)")
         self.option_enhance.setChecked(True)
         self.option_enhance.setToolTip("Optimise la qualité de l'image avant l'OCR")
         
+        self.option_otsu = QCheckBox("📄 Seuillage global Otsu (documents scannés)")
+        self.option_otsu.setChecked(False)
+        self.option_otsu.setToolTip(
+            "Seuil unique pour toute l'image : réservé aux scans bien éclairés.\n"
+            "Par défaut, un seuillage adaptatif gère les ombres des photos."
+        )
+        self.option_enhance.toggled.connect(self.option_otsu.setEnabled)
+        
         self.option_ocr = QCheckBox("📝 Extraction OCR (FR + AR + EN)")
         self.option_ocr.setChecked(True)
         self.option_ocr.setToolTip("Extrait le texte en français, arabe et anglais")
         
         options_layout.addWidget(self.option_enhance)
+        options_layout.addWidget(self.option_otsu)
         options_layout.addWidget(self.option_ocr)
         
         top_layout.addWidget(options_group, 2)
@@ -433,10 +1404,7 @@ class ImageProcessorInterface(QMainWindow):
         
         self.model_combo = QComboBox()
         self.model_combo.setMinimumWidth(180)
-        if self.gemini_manager and self.gemini_manager.available_models:
-            self.model_combo.addItems(self.gemini_manager.available_models)
-        else:
-            self.model_combo.addItems(GeminiAPIManager.RECOMMENDED_MODELS)
+        self.model_combo.addItems(GeminiAPIManager.RECOMMENDED_MODELS)  # En attendant la liste réelle
         self.model_combo.currentTextChanged.connect(self._on_model_changed)
         model_row.addWidget(self.model_combo)
         
@@ -469,6 +1437,13 @@ class ImageProcessorInterface(QMainWindow):
         self.start_btn.clicked.connect(self.launch_processing)
         action_layout.addWidget(self.start_btn)
         
+        self.cancel_btn = QPushButton("⏹ Annuler")
+        self.cancel_btn.setObjectName("SecondaryButton")
+        self.cancel_btn.setMinimumHeight(50)
+        self.cancel_btn.setVisible(False)
+        self.cancel_btn.clicked.connect(self._cancel_processing)
+        action_layout.addWidget(self.cancel_btn)
+        
         action_layout.addStretch(1)
         main_layout.addLayout(action_layout)
         
@@ -488,11 +1463,12 @@ class ImageProcessorInterface(QMainWindow):
         self.raw_text_edit = QPlainTextEdit()
         self.raw_text_edit.setPlaceholderText("Le texte extrait par OCR apparaîtra ici...")
         self.raw_text_edit.setReadOnly(True)
+        self._limit_text_layout(self.raw_text_edit)
         raw_layout.addWidget(self.raw_text_edit)
         
         copy_raw_btn = QPushButton("📋 Copier")
         copy_raw_btn.setObjectName("SecondaryButton")
-        copy_raw_btn.clicked.connect(lambda: self._copy_to_clipboard(self.raw_text_edit.toPlainText()))
+        copy_raw_btn.clicked.connect(partial(self._copy_widget, self.raw_text_edit))
         raw_layout.addWidget(copy_raw_btn)
         
         results_layout.addWidget(raw_group)
@@ -515,11 +1491,12 @@ class ImageProcessorInterface(QMainWindow):
         self.corrected_text_edit = QPlainTextEdit()
         self.corrected_text_edit.setPlaceholderText("Le texte corrigé par l'IA apparaîtra ici...")
         self.corrected_text_edit.setReadOnly(True)
+        self._limit_text_layout(self.corrected_text_edit)
         corrected_layout.addWidget(self.corrected_text_edit)
         
         copy_corrected_btn = QPushButton("📋 Copier")
         copy_corrected_btn.setObjectName("SecondaryButton")
-        copy_corrected_btn.clicked.connect(lambda: self._copy_to_clipboard(self.corrected_text_edit.toPlainText()))
+        copy_corrected_btn.clicked.connect(partial(self._copy_widget, self.corrected_text_edit))
         corrected_layout.addWidget(copy_corrected_btn)
         
         results_layout.addWidget(corrected_group)
@@ -548,44 +1525,190 @@ class ImageProcessorInterface(QMainWindow):
         self.setStatusBar(self.status_bar)
         self.status_bar.showMessage("Prêt. Chargez une image pour commencer.")
 
+        # Menu Outils
+        tools_menu = self.menuBar().addMenu("Outils")
+        clear_cache_action = QAction("🗑️ Vider le cache", self)
+        clear_cache_action.setToolTip("Supprime les résultats OCR et IA mémorisés")
+        clear_cache_action.triggered.connect(self._clear_cache)
+        tools_menu.addAction(clear_cache_action)
+
     # =========================================================================
     #                           MÉTHODES LOGIQUES
     # =========================================================================
 
     def optimize_img(self, img_cv2):
-        """Améliore l'image pour l'OCR (débruitage + seuillage Otsu)."""
-        gray = cv2.cvtColor(img_cv2, cv2.COLOR_BGR2GRAY)
-        denoised = cv2.medianBlur(gray, 3)
-        _, thresholded = cv2.threshold(
-            denoised, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU
+        """
+        Améliore l'image pour l'OCR (seuillage adaptatif gaussien).
+        Le seuil est calculé localement (blocs 31x31) : robuste aux ombres et
+        aux éclairages inégaux des photos. Le moyennage par bloc absorbe le
+        bruit, le filtre médian est donc inutile : une seule passe OpenCV.
+        """
+        img = np.ascontiguousarray(img_cv2, dtype=np.uint8)  # Sans copie si déjà conforme
+        gray = self._to_gray(img)
+        if self._is_binary_like(self._gray_hist(gray)):
+            return gray
+        return cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10,
+            dst=self._work_buffer("binary", gray.shape),
         )
-        return thresholded
 
-    def extract_txt(self, processed_img) -> str:
-        """Extrait le texte de l'image via Tesseract."""
-        custom_config = r'--psm 6 -l fra+ara+eng'
-        try:
-            text = pytesseract.image_to_string(processed_img, config=custom_config)
-            return text.strip()
-        except Exception as e:
-            return f"Erreur Tesseract: {str(e)}"
+    def optimize_img_otsu(self, img_cv2):
+        """
+        Améliore l'image pour l'OCR (débruitage + seuillage Otsu global).
+        Adapté aux documents scannés à l'éclairage uniforme. Tout le calcul
+        pixel est délégué à OpenCV (SIMD) ou à Numba sur un buffer uint8
+        contigu : pas de boucle Python ni d'aller-retour en flottants.
+        """
+        img = np.ascontiguousarray(img_cv2, dtype=np.uint8)  # Sans copie si déjà conforme
+        kernels = self._image_kernels()
+        if kernels is not None:
+            return self._optimize_img_numba(kernels, img)
+        
+        # Même schéma que la variante Numba : un seul histogramme sert au test
+        # "déjà binaire" et au seuil d'Otsu ; le filtre médian, qui commute
+        # avec le seuillage, est appliqué sur l'image binaire
+        gray = self._to_gray(img)
+        hist = self._gray_hist(gray)
+        if self._is_binary_like(hist):
+            return gray
+        _, binary = cv2.threshold(
+            gray, self._otsu_threshold(hist), 255, cv2.THRESH_BINARY,
+            dst=self._work_buffer("binary", gray.shape),
+        )
+        return cv2.medianBlur(binary, 3, dst=self._work_buffer("denoised", gray.shape))
+
+    def _work_buffer(self, name: str, shape: tuple):
+        """
+        Buffer uint8 réutilisable du worker courant, réalloué seulement si la
+        taille de l'image change. Le contenu n'est valable que jusqu'au
+        prétraitement suivant sur ce même worker (l'OCR de la page a lieu avant).
+        """
+        buffer = getattr(self._work_buffers, name, None)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            setattr(self._work_buffers, name, buffer)
+        return buffer
+
+    def _to_gray(self, img):
+        """Conversion en niveaux de gris dans le buffer de travail du worker."""
+        if img.ndim == 2:
+            return img
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=self._work_buffer("gray", img.shape[:2]))
+
+    @classmethod
+    def _image_kernels(cls):
+        """Module des noyaux Numba, importé au premier appel (None si indisponible)."""
+        if cls._kernels is None:
+            kernels = False
+            if NUMBA_AVAILABLE:
+                try:
+                    kernels = importlib.import_module(KERNELS_MODULE)
+                except ImportError as e:
+                    log.warning("Noyaux Numba indisponibles, repli sur OpenCV: %s", e)
+            cls._kernels = kernels
+        return cls._kernels or None
+
+    def _optimize_img_numba(self, kernels, img):
+        """
+        Variante Numba : gris + histogramme en une passe, seuil d'Otsu calculé
+        sur cet histogramme, puis binarisation. Le filtre médian commute avec
+        le seuillage : il est appliqué (à l'identique) sur l'image binaire.
+        """
+        if img.ndim == 2:
+            gray, hist = img, kernels.gray_hist(img)
+        else:
+            gray, hist = kernels.bgr_to_gray_and_hist(img)
+        if self._is_binary_like(hist):
+            return gray
+        binary = kernels.apply_threshold(gray, kernels.otsu_threshold(hist))
+        return cv2.medianBlur(binary, 3, dst=self._work_buffer("denoised", binary.shape))
+
+    @staticmethod
+    def ndarray_to_qimage(arr) -> QImage:
+        """
+        Vue QImage sur une image OpenCV, sans copie des pixels : Qt 6 lit le
+        BGR nativement (pas de cvtColor vers RGB). Le QImage garde une
+        référence au tableau, dont la mémoire doit rester valide tant qu'il vit.
+        """
+        if arr.ndim == 2:
+            image_format = QImage.Format.Format_Grayscale8
+        elif arr.shape[2] == 3:
+            image_format = QImage.Format.Format_BGR888
+        else:
+            raise ValueError(f"Image à {arr.shape[2]} canaux non prise en charge pour l'aperçu.")
+        if arr.dtype != np.uint8 or not arr.flags.c_contiguous:
+            arr = np.ascontiguousarray(arr, dtype=np.uint8)  # Vue découpée : copie inévitable
+        h, w = arr.shape[:2]
+        image = QImage(arr.data, w, h, arr.strides[0], image_format)
+        image._source_array = arr  # Empêche la libération du buffer par le GC
+        return image
+
+    @staticmethod
+    def _gray_hist(gray):
+        """Histogramme 256 niveaux d'une image en niveaux de gris (une passe OpenCV)."""
+        return cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+
+    @staticmethod
+    def _otsu_threshold(hist) -> int:
+        """
+        Seuil d'Otsu vectorisé (sommes cumulées sur 256 cases, sans boucle
+        Python) : même résultat que cv2.THRESH_OTSU sur le même histogramme.
+        """
+        p = hist.astype(np.float64) / hist.sum()
+        omega = np.cumsum(p)                   # Poids de la classe "fond" jusqu'à t
+        mu = np.cumsum(p * np.arange(256))     # Moyenne cumulée jusqu'à t
+        sigma_b2 = (mu[-1] * omega - mu) ** 2 / (omega * (1.0 - omega) + 1e-12)
+        return int(np.argmax(sigma_b2))
+
+    @classmethod
+    def _is_binary_like(cls, hist) -> bool:
+        """
+        Vrai si l'image est déjà quasi bicolore : les deux niveaux les plus
+        fréquents concentrent l'essentiel des pixels. Réduction fixe sur 256
+        cases, sans boucle Python.
+        """
+        top2 = np.partition(hist, -2)[-2:].sum()
+        return bool(top2 > cls.BINARY_MASS_RATIO * hist.sum())
+
+    @staticmethod
+    def _join_pages(paths: list, texts: list) -> str:
+        """Assemble le texte des pages (avec un en-tête par page si plusieurs)."""
+        if len(texts) == 1:
+            return texts[0]
+        return "\n\n".join(
+            f"=== Page {i} : {os.path.basename(path)} ===\n{text}"
+            for i, (path, text) in enumerate(zip(paths, texts), start=1)
+        )
+
+    @staticmethod
+    def _mean_confidence(pages: list):
+        """Confiance OCR moyenne des pages, pondérée par la longueur du texte."""
+        weighted = [(conf, len(text)) for text, conf in pages if text and conf is not None]
+        total = sum(length for _, length in weighted)
+        if not total:
+            return None
+        return sum(conf * length for conf, length in weighted) / total
 
     # =========================================================================
     #                           HANDLERS D'ÉVÉNEMENTS
     # =========================================================================
 
     def upload_file(self):
-        """Ouvre le dialogue de sélection de fichier."""
-        file_name, _ = QFileDialog.getOpenFileName(
-            self, "Sélectionner une Image", "",
+        """Ouvre le dialogue de sélection de fichiers (une ou plusieurs pages)."""
+        file_names, _ = QFileDialog.getOpenFileNames(
+            self, "Sélectionner une ou plusieurs Images", "",
             "Images (*.png *.jpg *.jpeg *.bmp *.tiff *.webp)"
         )
         
-        if file_name:
-            self.current_file_path = file_name
-            self.status_label.setText(f"📁 {os.path.basename(file_name)}")
+        if file_names:
+            self.current_file_paths = file_names
+            if len(file_names) == 1:
+                self.status_label.setText(f"📁 {os.path.basename(file_names[0])}")
+                self.status_bar.showMessage(f"Fichier chargé: {file_names[0]}")
+            else:
+                self.status_label.setText(f"📁 {len(file_names)} images sélectionnées")
+                self.status_bar.showMessage(f"{len(file_names)} fichiers chargés.")
             self.status_label.setStyleSheet("color: #27ae60; font-weight: bold;")
-            self.status_bar.showMessage(f"Fichier chargé: {file_name}")
             
             # Réinitialiser les zones de texte
             self.raw_text_edit.clear()
@@ -596,55 +1719,95 @@ class ImageProcessorInterface(QMainWindow):
             self.status_bar.showMessage("Sélection annulée.")
 
     def launch_processing(self):
-        """Lance l'extraction OCR."""
-        if not self.current_file_path:
+        """Lance l'extraction OCR sur toutes les images sélectionnées."""
+        if not self.current_file_paths:
             QMessageBox.warning(self, "Erreur", "Veuillez d'abord charger une image.")
             return
 
         # Réinitialiser
+        self.raw_extracted_text = ""
+        self.ocr_page_texts = []
+        self.ocr_confidence = None
         self.raw_text_edit.clear()
         self.corrected_text_edit.clear()
         self.doc_type_label.setText("Type de document: -")
+        
+        if not self.option_ocr.isChecked():
+            self._on_ocr_finished([])
+            return
+        
+        # Désactiver les contrôles pendant l'extraction
+        self.start_btn.setEnabled(False)
+        self.upload_btn.setEnabled(False)
+        self.ai_process_btn.setEnabled(False)
+        self.cancel_btn.setVisible(True)
+        self.cancel_btn.setEnabled(True)
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
-        self.progress_bar.setFormat("Chargement de l'image...")
-        QApplication.processEvents()
 
-        # Charger l'image (support des caractères spéciaux dans le chemin)
-        try:
-            file_data = np.fromfile(self.current_file_path, dtype=np.uint8)
-            img_source = cv2.imdecode(file_data, cv2.IMREAD_COLOR)
-        except Exception as e:
-            self.progress_bar.setVisible(False)
-            QMessageBox.critical(self, "Erreur", f"Impossible de lire le fichier: {str(e)}")
-            return
+        # Chargement, amélioration d'image et OCR des pages en parallèle
+        enhance = self.option_enhance.isChecked()
+        otsu = enhance and self.option_otsu.isChecked()
+        if not enhance:
+            preprocess = None
+        elif otsu:
+            preprocess = self.optimize_img_otsu
+        else:
+            preprocess = self.optimize_img
+        cache_options = (
+            f"{self.ocr_engine.lang}|psm={self.ocr_engine.psm}"
+            f"|tessdata={self.ocr_engine.tessdata_path}|enhance={int(enhance)}"
+            f"|otsu={int(otsu)}"
+        )
+        self.ocr_thread = OCRProcessingThread(
+            self.ocr_engine, self.current_file_paths, preprocess, self.cache, cache_options
+        )
+        self.ocr_thread.progress.connect(self._on_ocr_progress)
+        self.ocr_thread.finished.connect(self._on_ocr_finished)
+        self.ocr_thread.error.connect(self._on_ocr_error)
+        self.ocr_thread.cancelled.connect(self._on_ocr_cancelled)
+        if self._tess_ready:
+            self.ocr_thread.start()
+        else:
+            # Démarré par _on_warmup_finished, sans bloquer l'interface
+            self.progress_bar.setFormat("Chargement des modèles Tesseract...")
+            self._pending_ocr_thread = self.ocr_thread
 
-        if img_source is None:
-            self.progress_bar.setVisible(False)
-            QMessageBox.critical(self, "Erreur", "Format d'image non reconnu ou fichier corrompu.")
-            return
+    def _on_warmup_finished(self):
+        """Fin du préchargement Tesseract : lance le job OCR en attente, s'il y en a un."""
+        self._tess_ready = True
+        thread, self._pending_ocr_thread = self._pending_ocr_thread, None
+        if thread is not None:
+            thread.start()
 
-        working_image = img_source
-        self.progress_bar.setValue(25)
+    def _cancel_processing(self):
+        """Demande l'interruption de l'extraction OCR en cours."""
+        if self._pending_ocr_thread is not None:
+            # Job pas encore démarré (préchargement en cours) : simplement abandonné
+            self._pending_ocr_thread = self.ocr_thread = None
+            self._on_ocr_cancelled()
+        elif self.ocr_thread is not None and self.ocr_thread.isRunning():
+            self.ocr_thread.requestInterruption()
+            self.cancel_btn.setEnabled(False)
+            self.progress_bar.setFormat("Annulation en cours...")
 
-        # Amélioration d'image
-        if self.option_enhance.isChecked():
-            self.progress_bar.setFormat("Amélioration de l'image...")
-            QApplication.processEvents()
-            working_image = self.optimize_img(working_image)
-            self.progress_bar.setValue(50)
+    def _on_ocr_progress(self, value: int, message: str):
+        """Met à jour la barre de progression de l'extraction OCR."""
+        self.progress_bar.setValue(value)
+        self.progress_bar.setFormat(message)
 
-        # Extraction OCR
-        if self.option_ocr.isChecked():
-            self.progress_bar.setFormat("Extraction du texte (OCR)...")
-            QApplication.processEvents()
-            self.raw_extracted_text = self.extract_txt(working_image)
-            self.progress_bar.setValue(100)
-        
-        self.progress_bar.setVisible(False)
+    def _on_ocr_finished(self, pages: list):
+        """Callback quand l'extraction OCR est terminée (liste de (texte, confiance))."""
+        self._reset_ocr_controls()
+        texts = [text for text, _ in pages]
+        # Des pages toutes vides ne donnent pas de texte (pas seulement des en-têtes)
+        if any(text.strip() for text in texts):
+            self.ocr_page_texts = texts
+            self.raw_extracted_text = self._join_pages(self.current_file_paths, texts)
+            self.ocr_confidence = self._mean_confidence(pages)
 
         # Afficher le résultat
-        if self.raw_extracted_text:
+        if self.raw_extracted_text.strip():
             self.raw_text_edit.setPlainText(self.raw_extracted_text)
             self.ai_process_btn.setEnabled(True)
             self.status_bar.showMessage("✅ Extraction OCR terminée. Vous pouvez lancer le traitement IA.")
@@ -656,13 +1819,30 @@ class ImageProcessorInterface(QMainWindow):
             self.ai_process_btn.setEnabled(False)
             self.status_bar.showMessage("⚠️ Aucun texte détecté dans l'image.")
 
+    def _on_ocr_error(self, error_msg: str):
+        """Callback en cas d'erreur du thread OCR."""
+        self._reset_ocr_controls()
+        QMessageBox.critical(self, "Erreur", error_msg)
+        self.status_bar.showMessage(f"❌ Erreur OCR: {error_msg}")
+
+    def _on_ocr_cancelled(self):
+        """Callback quand l'extraction OCR a été annulée."""
+        self._reset_ocr_controls()
+        self.status_bar.showMessage("Extraction OCR annulée.")
+
+    def _reset_ocr_controls(self):
+        """Réactive les contrôles après l'extraction OCR."""
+        self.progress_bar.setVisible(False)
+        self.cancel_btn.setVisible(False)
+        self.start_btn.setEnabled(True)
+        self.upload_btn.setEnabled(True)
+
     def _prompt_ai_processing(self):
         """Demande à l'utilisateur s'il souhaite lancer le traitement IA."""
         if not GEMINI_AVAILABLE or not self.gemini_manager:
             return
-            
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key or api_key == "votre_cle_api_google_ici":
+        
+        if not self._api_key_valid:
             QMessageBox.information(
                 self, "Configuration requise",
                 "Pour utiliser le traitement IA, configurez votre clé API Google:\n\n"
@@ -672,8 +1852,15 @@ class ImageProcessorInterface(QMainWindow):
             )
             return
         
+        # Texte trop court ou OCR peu fiable : inutile de proposer l'envoi
+        if not GeminiAPIManager.is_worth_processing(self.ocr_page_texts, self.ocr_confidence):
+            self.status_bar.showMessage(
+                "⚠️ Texte trop court ou OCR peu fiable : traitement IA non proposé."
+            )
+            return
+        
         # Dialogue de confirmation
-        dialog = AIConfirmationDialog(self.raw_extracted_text, self)
+        dialog = AIConfirmationDialog(AIConfirmationDialog.make_preview(self.raw_extracted_text), self)
         if dialog.exec() == QDialog.Accepted:
             self._launch_ai_processing()
 
@@ -683,6 +1870,14 @@ class ImageProcessorInterface(QMainWindow):
             QMessageBox.warning(self, "Erreur", "Aucun texte à traiter. Lancez d'abord l'extraction OCR.")
             return
         
+        # Réponse déjà connue pour ce texte et ce modèle : pas d'appel à Gemini
+        cache_key = GeminiResponseCache.key(self.model_combo.currentText(), self.raw_extracted_text)
+        cached = self.ai_cache.get(cache_key)
+        if cached is not None:
+            self._on_ai_finished(cached)
+            self.status_bar.showMessage("✅ Résultat IA restauré depuis le cache.")
+            return
+        
         if not GEMINI_AVAILABLE:
             QMessageBox.critical(
                 self, "Erreur",
@@ -692,8 +1887,7 @@ class ImageProcessorInterface(QMainWindow):
             return
         
         # Vérifier la configuration API
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key or api_key == "votre_cle_api_google_ici":
+        if not self._api_key_valid:
             QMessageBox.warning(
                 self, "Configuration requise",
                 "Clé API Google non configurée.\n\n"
@@ -703,7 +1897,7 @@ class ImageProcessorInterface(QMainWindow):
         
         # Configurer si nécessaire
         if not self.gemini_manager.model:
-            self.gemini_manager.configure(api_key)
+            self.gemini_manager.configure(self._api_key)
             self.gemini_manager.select_model(self.model_combo.currentText())
         
         # Désactiver les contrôles pendant le traitement
@@ -713,13 +1907,22 @@ class ImageProcessorInterface(QMainWindow):
         self.progress_bar.setRange(0, 0)  # Mode indéterminé
         self.progress_bar.setFormat("Traitement IA en cours...")
         self.status_bar.showMessage(f"🤖 Envoi au modèle {self.model_combo.currentText()}...")
-        QApplication.processEvents()
         
-        # Lancer le thread de traitement
-        self.ai_thread = AIProcessingThread(self.gemini_manager, self.raw_extracted_text)
-        self.ai_thread.finished.connect(self._on_ai_finished)
-        self.ai_thread.error.connect(self._on_ai_error)
-        self.ai_thread.start()
+        # Lancer la tâche de traitement dans le pool
+        task = AIProcessingRunnable(
+            self.gemini_manager, self.raw_extracted_text, self.ocr_confidence, self.ocr_page_texts
+        )
+        task.signals.chunk_received.connect(self._on_ai_chunk)
+        task.signals.finished.connect(self._on_ai_finished)
+        task.signals.error.connect(self._on_ai_error)
+        self.corrected_text_edit.clear()
+        self._pending_ai_key = cache_key
+        self.ai_pool.start(task)
+
+    def _on_ai_chunk(self, chunk: str):
+        """Affiche progressivement la réponse de l'IA pendant le streaming."""
+        self.corrected_text_edit.moveCursor(QTextCursor.End)
+        self.corrected_text_edit.insertPlainText(chunk)
 
     def _on_ai_finished(self, result: dict):
         """Callback quand le traitement IA est terminé."""
@@ -727,27 +1930,37 @@ class ImageProcessorInterface(QMainWindow):
         self.progress_bar.setRange(0, 100)
         self.ai_process_btn.setEnabled(True)
         self.start_btn.setEnabled(True)
+        cache_key, self._pending_ai_key = self._pending_ai_key, None
         
         if "error" in result:
             QMessageBox.warning(self, "Erreur IA", result["error"])
             self.status_bar.showMessage(f"❌ Erreur: {result['error']}")
             return
         
+        # Seules les réponses exploitables sont mises en cache : une réponse
+        # non balisée ou tronquée doit pouvoir être redemandée à Gemini
+        if cache_key and not result.get("skipped") and result.get("texte_corrige"):
+            self.ai_cache.set(cache_key, result)
+        
         # Afficher les résultats
-        self.corrected_text_edit.setPlainText(result.get("texte_corrige", ""))
+        self.corrected_text_edit.setPlainText(result.get("texte_corrige") or result.get("raw_response", ""))
         
         doc_type = result.get("type_document", "Non détecté")
         confidence = result.get("confiance", "")
         self.doc_type_label.setText(f"📋 Type de document: {doc_type} (Confiance: {confidence})")
         
-        self.status_bar.showMessage("✅ Traitement IA terminé avec succès!")
+        if result.get("skipped"):
+            self.status_bar.showMessage("⚠️ Texte trop court ou OCR peu fiable : l'IA n'a pas été sollicitée.")
+        else:
+            self.status_bar.showMessage("✅ Traitement IA terminé avec succès!")
 
     def _on_ai_error(self, error_msg: str):
-        """Callback en cas d'erreur du thread IA."""
+        """Callback en cas d'erreur de la tâche IA."""
         self.progress_bar.setVisible(False)
         self.progress_bar.setRange(0, 100)
         self.ai_process_btn.setEnabled(True)
         self.start_btn.setEnabled(True)
+        self._pending_ai_key = None
         
         QMessageBox.critical(self, "Erreur", f"Erreur lors du traitement IA:\n{error_msg}")
         self.status_bar.showMessage(f"❌ Erreur IA: {error_msg}")
@@ -759,37 +1972,96 @@ class ImageProcessorInterface(QMainWindow):
             self.status_bar.showMessage(f"Modèle sélectionné: {model_name}")
 
     def _refresh_models(self):
-        """Actualise la liste des modèles disponibles."""
+        """Actualise la liste des modèles disponibles (et relit la clé API du .env)."""
         if not GEMINI_AVAILABLE or not self.gemini_manager:
             return
-            
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key or api_key == "votre_cle_api_google_ici":
+        
+        self._reload_api_key(reread_dotenv=True)
+        self._update_api_status()
+        if not self._api_key_valid:
             QMessageBox.warning(self, "Configuration", "Configurez d'abord votre clé API Google.")
             return
         
-        self.gemini_manager.configure(api_key)
-        models = self.gemini_manager.fetch_available_models()
-        
-        self.model_combo.clear()
-        self.model_combo.addItems(models)
+        if self._start_model_fetch(self._api_key, force_refresh=True, announce=True):
+            self.status_bar.showMessage("🔄 Actualisation de la liste des modèles...")
+
+    def _start_model_fetch(self, api_key: str, force_refresh: bool = False, announce: bool = False) -> bool:
+        """
+        Lance la récupération des modèles en arrière-plan (sauf si déjà en cours).
+        Avec `announce`, le nombre de modèles reçus est affiché dans la barre d'état.
+        """
+        if self.model_fetch_thread is not None and self.model_fetch_thread.isRunning():
+            return False
+        self.refresh_models_btn.setEnabled(False)
+        self.model_fetch_thread = ModelFetchThread(self.gemini_manager, api_key, force_refresh)
+        # Connexions établies avant start() : aucun signal ne peut être perdu
+        self.model_fetch_thread.error.connect(self._on_models_fetch_error)
+        self.model_fetch_thread.finished.connect(self._on_models_fetched)
+        if announce:
+            self.model_fetch_thread.finished.connect(self._on_models_refreshed)
+        self.model_fetch_thread.start()
+        return True
+
+    def _on_models_fetch_error(self, error_msg: str):
+        """Callback d'un échec de récupération des modèles (liste actuelle conservée)."""
+        self.status_bar.showMessage(f"❌ {error_msg}")
+
+    def _on_models_fetched(self, models: list):
+        """Remplace les modèles du menu déroulant en conservant la sélection si possible."""
+        self.refresh_models_btn.setEnabled(True)
+        if models:
+            current = self.model_combo.currentText()
+            self.model_combo.blockSignals(True)
+            self.model_combo.clear()
+            self.model_combo.addItems(models)
+            if current in models:
+                self.model_combo.setCurrentText(current)
+            self.model_combo.blockSignals(False)
+            self.gemini_manager.select_model(self.model_combo.currentText())
         self._update_api_status()
-        self.status_bar.showMessage(f"✅ {len(models)} modèles disponibles.")
+
+    def _on_models_refreshed(self, models: list):
+        """Callback d'une actualisation demandée par l'utilisateur (succès uniquement)."""
+        if models:
+            self.status_bar.showMessage(f"✅ {len(models)} modèles disponibles.")
+
+    def _reload_api_key(self, reread_dotenv: bool = False):
+        """
+        Lit la clé API Google de l'environnement et mémorise sa validité.
+        Avec `reread_dotenv`, la clé est relue dans .env (modifié depuis le
+        lancement), sauf si elle a été fournie par le shell.
+        """
+        if reread_dotenv and not API_KEY_FROM_SHELL:
+            key = dotenv_values().get("GOOGLE_API_KEY")
+            if key:
+                os.environ["GOOGLE_API_KEY"] = key
+            else:
+                os.environ.pop("GOOGLE_API_KEY", None)
+        self._api_key = os.getenv("GOOGLE_API_KEY") or ""
+        self._api_key_valid = bool(self._api_key) and self._api_key != self.API_KEY_PLACEHOLDER
 
     def _update_api_status(self):
         """Met à jour l'affichage du statut de l'API."""
-        api_key = os.getenv("GOOGLE_API_KEY")
-        
         if not GEMINI_AVAILABLE:
             self.api_status_label.setText("❌ Bibliothèque non installée")
             self.api_status_label.setStyleSheet("color: #e74c3c;")
-        elif not api_key or api_key == "votre_cle_api_google_ici":
+        elif not self._api_key_valid:
             self.api_status_label.setText("⚠️ Clé API non configurée")
             self.api_status_label.setStyleSheet("color: #f39c12;")
         else:
             self.api_status_label.setText("✅ API configurée")
             self.api_status_label.setStyleSheet("color: #27ae60;")
 
+    def _clear_cache(self):
+        """Vide les caches des résultats OCR et IA."""
+        self.cache.clear()
+        self.ai_cache.clear()
+        self.status_bar.showMessage("🗑️ Cache OCR et IA vidé.")
+
+    def _copy_widget(self, text_edit):
+        """Copie le contenu d'une zone de texte dans le presse-papiers."""
+        self._copy_to_clipboard(text_edit.toPlainText())
+
     def _copy_to_clipboard(self, text: str):
         """Copie le texte dans le presse-papiers."""
         if text:
@@ -799,152 +2071,59 @@ class ImageProcessorInterface(QMainWindow):
         else:
             self.status_bar.showMessage("⚠️ Rien à copier.")
 
+    def closeEvent(self, event):
+        """Libère le moteur OCR à la fermeture de la fenêtre."""
+        if self._pending_ocr_thread is not None:
+            self._pending_ocr_thread = self.ocr_thread = None  # Ne doit plus démarrer
+        self.warmup_thread.wait()
+        if self.model_fetch_thread is not None:
+            self.model_fetch_thread.wait()
+        if self.ocr_thread is not None:
+            self.ocr_thread.requestInterruption()
+            self.ocr_thread.wait()
+        self.ocr_engine.close()
+        self.cache.close()
+        self.ai_cache.close()
+        super().closeEvent(event)
+
+    def _limit_text_layout(self, text_edit):
+        """
+        Allège les zones de résultat pour les documents longs. Le texte n'est
+        pas tronqué : QPlainTextEdit ne met en page que les lignes visibles,
+        et la copie doit restituer l'intégralité du texte.
+        """
+        text_edit.setUndoRedoEnabled(False)  # Lecture seule : pas d'historique à conserver
+
     def _create_separator(self):
         """Crée un séparateur horizontal."""
         separator = QWidget()
         separator.setFixedHeight(1)
-        separator.setStyleSheet("background-color: #bdc3c7;")
+        separator.setStyleSheet(self._SEP_STYLE)
         return separator
 
-    def _get_professional_stylesheet(self):
-        """Retourne la feuille de style de l'application."""
-        return """
-            QMainWindow { background-color: #ffffff; }
-            
-            QWidget { 
-                background-color: #ffffff;
-                font-family: 'Segoe UI', 'Arial', sans-serif;
-                color: #2c3e50;
-            }
-            
-            QGroupBox {
-                font-weight: bold;
-                color: #2c3e50;
-                border: 1px solid #dcdfe4;
-                border-radius: 8px;
-                margin-top: 12px;
-                padding: 15px;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 12px;
-                padding: 0 8px;
-                background-color: #ffffff;
-                color: #2c3e50;
-            }
-            
-            QCheckBox {
-                color: #2c3e50;
-                spacing: 8px;
-                font-size: 10pt;
-            }
-            QCheckBox::indicator {
-                width: 18px;
-                height: 18px;
-            }
-            
-            QComboBox {
-                padding: 6px 10px;
-                border: 1px solid #bdc3c7;
-                border-radius: 4px;
-                background-color: #ffffff;
-                color: #2c3e50;
-            }
-            QComboBox:hover { border-color: #3498db; }
-            QComboBox::drop-down {
-                border: none;
-                width: 25px;
-            }
-            
-            QPlainTextEdit {
-                border: 1px solid #bdc3c7;
-                border-radius: 6px;
-                padding: 10px;
-                background-color: #f8f9fa;
-                color: #2c3e50;
-                font-size: 10pt;
-                font-family: 'Consolas', 'Courier New', monospace;
-            }
-            
-            QProgressBar {
-                border: 1px solid #bdc3c7;
-                border-radius: 4px;
-                text-align: center;
-                background-color: #ecf0f1;
-            }
-            QProgressBar::chunk {
-                background-color: #3498db;
-                border-radius: 3px;
-            }
-            
-            QPushButton#PrimaryButton {
-                background-color: #34495e;
-                color: white;
-                border-radius: 6px;
-                padding: 10px 15px;
-                border: none;
-                font-weight: bold;
-            }
-            QPushButton#PrimaryButton:hover { background-color: #2c3e50; }
-            
-            QPushButton#AccentButton {
-                background-color: #3498db;
-                color: white;
-                border-radius: 8px;
-                font-weight: bold;
-                font-size: 12pt;
-                border: none;
-                padding: 12px 25px;
-            }
-            QPushButton#AccentButton:hover { background-color: #2980b9; }
-            QPushButton#AccentButton:disabled { background-color: #bdc3c7; }
-            
-            QPushButton#SecondaryButton {
-                background-color: #ecf0f1;
-                color: #2c3e50;
-                border: 1px solid #bdc3c7;
-                border-radius: 4px;
-                padding: 6px 15px;
-            }
-            QPushButton#SecondaryButton:hover { background-color: #d5dbdb; }
-            
-            QPushButton#AIButton {
-                background-color: #9b59b6;
-                color: white;
-                border-radius: 6px;
-                padding: 10px 20px;
-                font-weight: bold;
-                border: none;
-            }
-            QPushButton#AIButton:hover { background-color: #8e44ad; }
-            QPushButton#AIButton:disabled { background-color: #bdc3c7; }
-            
-            QStatusBar {
-                background-color: #f0f0f0;
-                color: #2c3e50;
-                border-top: 1px solid #dcdfe4;
-            }
-            
-            QLabel {
-                color: #2c3e50;
-            }
-        """
-
 
 # =============================================================================
 #                               POINT D'ENTRÉE
 # =============================================================================
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s [%(name)s] %(message)s")
+    
     # Afficher les infos de configuration au démarrage
     print("=" * 60)
     print("  OCR Intelligent + Google Gemini AI")
     print("=" * 60)
-    print(f"  • Tesseract: {pytesseract.pytesseract.tesseract_cmd}")
+    tessdata_path, _ = get_languages()
+    print(f"  • Tesseract: {tesseract_version().splitlines()[0]} ({tessdata_path})")
+    if NUMBA_AVAILABLE:
+        backend = "Numba (AOT)" if KERNELS_MODULE == "image_kernels_aot" else "Numba (JIT)"
+    else:
+        backend = "OpenCV"
+    print(f"  • Prétraitement Otsu: {backend}")
     print(f"  • Gemini API: {'Disponible' if GEMINI_AVAILABLE else 'Non installé'}")
     
     api_key = os.getenv("GOOGLE_API_KEY")
-    if api_key and api_key != "votre_cle_api_google_ici":
+    if api_key and api_key != ImageProcessorInterface.API_KEY_PLACEHOLDER:
         print("  • Clé API: Configurée ✓")
     else:
         print("  • Clé API: Non configurée (créez un fichier .env)")
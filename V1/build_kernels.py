@@ -0,0 +1,37 @@
+"""
+=============================================================================
+ Compilation anticipée (AOT) des noyaux de prétraitement
+=============================================================================
+ Produit le module d'extension `image_kernels_aot` (à côté de ce fichier) à
+ partir des noyaux de image_kernels.py, via numba.pycc. OCR_V1.py l'importe
+ en priorité : plus de compilation JIT au premier OCR, et le module compilé
+ fonctionne sans Numba installé.
+
+ Usage : python build_kernels.py
+ (numba.pycc est déprécié : à défaut, image_kernels.py reste utilisé en JIT
+ avec cache disque)
+=============================================================================
+"""
+
+import os
+
+from numba.pycc import CC
+
+import image_kernels
+
+cc = CC("image_kernels_aot")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Signatures explicites : une seule spécialisation par noyau
+cc.export("bgr_to_gray_and_hist", "Tuple((uint8[:, :], uint32[:]))(uint8[:, :, :])")(
+    image_kernels.bgr_to_gray_and_hist.py_func
+)
+cc.export("gray_hist", "uint32[:](uint8[:, :])")(image_kernels.gray_hist.py_func)
+cc.export("otsu_threshold", "int64(uint32[:])")(image_kernels.otsu_threshold.py_func)
+cc.export("apply_threshold", "uint8[:, :](uint8[:, :], int64)")(
+    image_kernels.apply_threshold.py_func
+)
+
+if __name__ == "__main__":
+    cc.compile()
+    print(f"Module {cc.name} généré dans {cc.output_dir}")
@@ -0,0 +1,95 @@
+"""
+=============================================================================
+ Noyaux numériques du prétraitement d'image (Numba)
+=============================================================================
+ Conversion BGR -> niveaux de gris, histogramme et seuillage Otsu compilés
+ avec Numba. La conversion et l'histogramme sont fusionnés en une seule
+ passe sur l'image (au lieu de cvtColor puis d'un second parcours pour
+ l'histogramme).
+
+ Noyaux séquentiels (sans parallel=True) : ils sont appelés simultanément
+ depuis le pool de pages, que la couche de threads de Numba ne supporte
+ pas ; le parallélisme reste au niveau des pages.
+
+ Module optionnel : OCR_V1.py se replie sur OpenCV si Numba est absent.
+=============================================================================
+"""
+
+import numpy as np
+from numba import njit
+
+# Poids BT.601 en virgule fixe (15 bits), identiques à ceux de cv2.cvtColor
+# (COLOR_BGR2GRAY) : résultat au bit près et calcul entier uniquement
+_GRAY_B, _GRAY_G, _GRAY_R = 3735, 19235, 9798
+_GRAY_SHIFT = 15
+_GRAY_ROUND = 1 << (_GRAY_SHIFT - 1)
+
+
+@njit(nogil=True, cache=True)
+def bgr_to_gray_and_hist(img):
+    """Convertit une image BGR en niveaux de gris et calcule son histogramme."""
+    h, w = img.shape[0], img.shape[1]
+    gray = np.empty((h, w), np.uint8)
+    hist = np.zeros(256, np.uint32)
+
+    for y in range(h):
+        for x in range(w):
+            value = np.uint8(
+                (_GRAY_B * np.uint32(img[y, x, 0]) + _GRAY_G * np.uint32(img[y, x, 1])
+                 + _GRAY_R * np.uint32(img[y, x, 2]) + _GRAY_ROUND) >> _GRAY_SHIFT
+            )
+            gray[y, x] = value
+            hist[value] += 1
+    return gray, hist
+
+
+@njit(nogil=True, cache=True)
+def gray_hist(gray):
+    """Histogramme 256 niveaux d'une image déjà en niveaux de gris."""
+    h, w = gray.shape
+    hist = np.zeros(256, np.uint32)
+    for y in range(h):
+        for x in range(w):
+            hist[gray[y, x]] += 1
+    return hist
+
+
+@njit(nogil=True, cache=True)
+def otsu_threshold(hist):
+    """Seuil d'Otsu (maximisation de la variance inter-classes) à partir de l'histogramme."""
+    total = 0.0
+    sum_all = 0.0
+    for t in range(256):
+        total += hist[t]
+        sum_all += t * hist[t]
+
+    weight_bg = 0.0
+    sum_bg = 0.0
+    best_threshold = 0
+    best_variance = -1.0
+    for t in range(256):
+        weight_bg += hist[t]
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * hist[t]
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            best_threshold = t
+    return best_threshold
+
+
+@njit(nogil=True, cache=True)
+def apply_threshold(gray, threshold):
+    """Binarisation (255 au-dessus du seuil, 0 sinon), comme cv2.THRESH_BINARY."""
+    h, w = gray.shape
+    binary = np.empty((h, w), np.uint8)
+    for y in range(h):
+        for x in range(w):
+            binary[y, x] = 255 if gray[y, x] > threshold else 0
+    return binary